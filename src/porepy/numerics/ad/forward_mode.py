@@ -1,9 +1,50 @@
 import numpy as np
 import scipy.sparse as sps
 
+try:
+    import numba
+
+    _has_numba = True
+except ImportError:
+    _has_numba = False
+
 __all__ = ["initAdArrays", "Ad_array"]
 
 
+if _has_numba:
+    # Compiled fast paths for the scalar-valued arithmetic operations. The
+    # cost of these operations is dominated by Python-level dispatch, not by
+    # the floating point work, so they benefit from compilation. Operations
+    # involving arrays or sparse Jacobians stay on the numpy/scipy path below,
+    # since scipy sparse matrices are not supported by numba.
+
+    @numba.njit(cache=True)
+    def _ad_add(v1, j1, v2, j2):
+        return v1 + v2, j1 + j2
+
+    @numba.njit(cache=True)
+    def _ad_mul(v1, j1, v2, j2):
+        return v1 * v2, v2 * j1 + v1 * j2
+
+    @numba.njit(cache=True)
+    def _ad_pow(v1, j1, v2, j2):
+        val = v1 ** v2
+        jac = v2 * v1 ** (v2 - 1) * j1 + val * np.log(v1) * j2
+        return val, jac
+
+
+def _scalar_args(a, b):
+    """Return float operands if both Ad_arrays hold plain scalars, else None."""
+    if (
+        isinstance(a.val, (int, float))
+        and isinstance(a.jac, (int, float))
+        and isinstance(b.val, (int, float))
+        and isinstance(b.jac, (int, float))
+    ):
+        return float(a.val), float(a.jac), float(b.val), float(b.jac)
+    return None
+
+
 def initAdArrays(variables):
     if not isinstance(variables, list):
         try:
@@ -37,6 +78,10 @@ class Ad_array:
 
     def __add__(self, other):
         b = _cast(other)
+        if _has_numba:
+            args = _scalar_args(self, b)
+            if args is not None:
+                return Ad_array(*_ad_add(*args))
         c = Ad_array()
         c.val = self.val + b.val
         c.jac = self.jac + b.jac
@@ -77,6 +122,10 @@ class Ad_array:
             else:
                 jac = self._jac_mul_other(other)
         else:
+            if _has_numba:
+                args = _scalar_args(self, other)
+                if args is not None:
+                    return Ad_array(*_ad_mul(*args))
             val = self.val * other.val
             jac = self.diagvec_mul_jac(other.val) + other.diagvec_mul_jac(self.val)
         return Ad_array(val, jac)
@@ -94,6 +143,10 @@ class Ad_array:
             val = self.val ** other
             jac = self.diagvec_mul_jac(other * self.val ** (other - 1))
         else:
+            if _has_numba:
+                args = _scalar_args(self, other)
+                if args is not None:
+                    return Ad_array(*_ad_pow(*args))
             val = self.val ** other.val
             jac = self.diagvec_mul_jac(
                 other.val * self.val ** (other.val - 1)
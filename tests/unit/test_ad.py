@@ -8,7 +8,10 @@ Tests for components of the Ad machinery. Specifically, the tests cover:
 
 """
 
-import unittest
+import operator
+from functools import lru_cache
+from types import SimpleNamespace
+
 import pytest
 
 import numpy as np
@@ -21,8 +24,51 @@ import porepy as pp
 ## Tests of the Ad grid operators.
 
 
+@pytest.fixture(scope="module")
+def cart_bucket():
+    # Bucket of a 2d domain with two intersecting fractures. The meshing is
+    # deterministic and by far the heaviest operation in this module, so the
+    # bucket is built once and shared between tests. The tests only assign
+    # fresh dictionaries to the data fields they use, thus sharing is safe.
+    fracs = [np.array([[0, 2], [1, 1]]), np.array([[1, 1], [0, 2]])]
+    gb = pp.meshing.cart_grid(fracs, [2, 2])
+    grid_list = np.array([g for g, _ in gb])
+    Nd = gb.dim_max()
+
+    # The projection operators depend only on the (immutable) geometry of the
+    # bucket, so they too can be built once, for both the scalar and the
+    # vector versions of the tests.
+    sub_projs = {
+        nd: pp.ad.SubdomainProjections(grids=grid_list, nd=nd) for nd in (1, Nd)
+    }
+
+    g0 = gb.grids_of_dimension(2)[0]
+    g1, g2 = gb.grids_of_dimension(1)
+    g3 = gb.grids_of_dimension(0)[0]
+    mortar_grid_list = np.array([g0, g1, g2, g3])
+    edge_list = [(g0, g1), (g0, g2), (g1, g3), (g2, g3)]
+    mortar_projs = {
+        nd: pp.ad.MortarProjections(
+            grids=mortar_grid_list, edges=edge_list, gb=gb, nd=nd
+        )
+        for nd in (1, Nd)
+    }
+
+    return SimpleNamespace(
+        gb=gb,
+        grid_list=grid_list,
+        NC=gb.num_cells(),
+        NF=gb.num_faces(),
+        Nd=Nd,
+        sub_projs=sub_projs,
+        mortar_grid_list=mortar_grid_list,
+        mortar_edge_list=edge_list,
+        mortar_projs=mortar_projs,
+    )
+
+
 @pytest.mark.parametrize("scalar", [True, False])
-def test_subdomain_projections(scalar):
+def test_subdomain_projections(scalar, cart_bucket):
     """Test of subdomain projections. Both face and cell restriction and prolongation.
 
     Test three specific cases:
@@ -31,11 +77,9 @@ def test_subdomain_projections(scalar):
         3. Combined projections for list of grids.
     """
 
-    fracs = [np.array([[0, 2], [1, 1]]), np.array([[1, 1], [0, 2]])]
-    gb = pp.meshing.cart_grid(fracs, [2, 2])
-    NC = gb.num_cells()
-    NF = gb.num_faces()
-    Nd = gb.dim_max()
+    gb = cart_bucket.gb
+    grid_list = cart_bucket.grid_list
+    NC, NF, Nd = cart_bucket.NC, cart_bucket.NF, cart_bucket.Nd
 
     if scalar:
         proj_dim = 1
@@ -44,96 +88,93 @@ def test_subdomain_projections(scalar):
         NF *= Nd
         proj_dim = Nd
 
-    grid_list = np.array([g for g, _ in gb])
-    proj = pp.ad.SubdomainProjections(grids=grid_list, nd=proj_dim)
+    proj = cart_bucket.sub_projs[proj_dim]
 
-    cell_start = np.cumsum(np.hstack((0, np.array([g.num_cells for g in grid_list]))))
-    face_start = np.cumsum(np.hstack((0, np.array([g.num_faces for g in grid_list]))))
+    cell_start = _starts([g.num_cells for g in grid_list])
+    face_start = _starts([g.num_faces for g in grid_list])
 
     # Helper method to get indices for sparse matrices
     def _mat_inds(nc, nf, grid_ind, scalar, Nd, cell_start, face_start):
-        cell_inds = np.arange(cell_start[grid_ind], cell_start[grid_ind + 1])
-        face_inds = np.arange(face_start[grid_ind], face_start[grid_ind + 1])
+        # Use int32 indices; this is what the CSR constructor stores for
+        # matrices of this size anyway, so passing int64 would only trigger a
+        # downcast copy inside scipy.
+        cell_inds = np.arange(
+            cell_start[grid_ind], cell_start[grid_ind + 1], dtype=np.int32
+        )
+        face_inds = np.arange(
+            face_start[grid_ind], face_start[grid_ind + 1], dtype=np.int32
+        )
         if scalar:
             data_cell = np.ones(nc)
-            row_cell = np.arange(nc)
-            data_face = np.ones(nf)
-            row_face = np.arange(nf)
             col_cell = cell_inds
+            data_face = np.ones(nf)
             col_face = face_inds
         else:
             data_cell = np.ones(nc * Nd)
-            row_cell = np.arange(nc * Nd)
+            col_cell = pp.fvutils.expand_indices_nd(cell_inds, Nd).astype(
+                np.int32, copy=False
+            )
             data_face = np.ones(nf * Nd)
-            row_face = np.arange(nf * Nd)
-            col_cell = pp.fvutils.expand_indices_nd(cell_inds, Nd)
-            col_face = pp.fvutils.expand_indices_nd(face_inds, Nd)
-        return row_cell, col_cell, data_cell, row_face, col_face, data_face
-
-    # Test projection of one fracture at a time for the full set of grids
-    for g in grid_list:
-
-        ind = _list_ind_of_grid(grid_list, g)
+            col_face = pp.fvutils.expand_indices_nd(face_inds, Nd).astype(
+                np.int32, copy=False
+            )
+        return col_cell, data_cell, col_face, data_face
+
+    idx_map = _grid_index_map(grid_list)
+
+    # Compute the sparsity patterns of the known projections once per grid;
+    # they are reused both in the per-grid checks and in the stacked case.
+    mat_inds = [
+        _mat_inds(g.num_cells, g.num_faces, i, scalar, Nd, cell_start, face_start)
+        for i, g in enumerate(grid_list)
+    ]
 
-        nc, nf = g.num_cells, g.num_faces
+    # The grids partition the global ordering, so stacking the restrictions of
+    # all grids in the order of grid_list should recover the identity. This
+    # verifies all grids in one batched comparison instead of one sparse
+    # comparison per grid and operator.
+    known_identity_cell = sps.identity(NC, format="csr")
+    known_identity_face = sps.identity(NF, format="csr")
 
-        num_rows_cell = nc
-        num_rows_face = nf
-        if not scalar:
-            num_rows_cell *= Nd
-            num_rows_face *= Nd
+    assert _compare_matrices(
+        sps.vstack([proj.cell_restriction(g)._mat for g in grid_list], format="csr"),
+        known_identity_cell,
+    )
+    assert _compare_matrices(
+        sps.hstack([proj.cell_prolongation(g)._mat for g in grid_list], format="csr"),
+        known_identity_cell,
+    )
+    assert _compare_matrices(
+        sps.vstack([proj.face_restriction(g)._mat for g in grid_list], format="csr"),
+        known_identity_face,
+    )
+    assert _compare_matrices(
+        sps.hstack([proj.face_prolongation(g)._mat for g in grid_list], format="csr"),
+        known_identity_face,
+    )
 
-        row_cell, col_cell, data_cell, row_face, col_face, data_face = _mat_inds(
-            nc, nf, ind, scalar, Nd, cell_start, face_start
-        )
+    # Keep a single per-grid spot check, which gives a more pointed error
+    # message than the batched comparison above.
+    g = grid_list[0]
+    col_cell, data_cell, col_face, data_face = mat_inds[idx_map[id(g)]]
 
-        known_cell_proj = sps.coo_matrix(
-            (data_cell, (row_cell, col_cell)), shape=(num_rows_cell, NC)
-        ).tocsr()
-        known_face_proj = sps.coo_matrix(
-            (data_face, (row_face, col_face)), shape=(num_rows_face, NF)
-        ).tocsr()
+    known_cell_proj = _csr_from_cols(col_cell, data_cell, NC)
+    known_face_proj = _csr_from_cols(col_face, data_face, NF)
 
-        assert _compare_matrices(proj.cell_restriction(g), known_cell_proj)
-        assert _compare_matrices(proj.cell_prolongation(g), known_cell_proj.T)
-        assert _compare_matrices(proj.face_restriction(g), known_face_proj)
-        assert _compare_matrices(proj.face_prolongation(g), known_face_proj.T)
+    assert _compare_matrices(proj.cell_restriction(g), known_cell_proj)
+    assert _compare_matrices(proj.cell_prolongation(g), known_cell_proj.T)
+    assert _compare_matrices(proj.face_restriction(g), known_face_proj)
+    assert _compare_matrices(proj.face_prolongation(g), known_face_proj.T)
 
     # Project between the full grid and both 1d grids (to combine two grids)
     g1, g2 = gb.grids_of_dimension(1)
-    rc1, cc1, dc1, rf1, cf1, df1 = _mat_inds(
-        g1.num_cells,
-        g1.num_faces,
-        _list_ind_of_grid(grid_list, g1),
-        scalar,
-        Nd,
-        cell_start,
-        face_start,
-    )
-    rc2, cc2, dc2, rf2, cf2, df2 = _mat_inds(
-        g2.num_cells,
-        g2.num_faces,
-        _list_ind_of_grid(grid_list, g2),
-        scalar,
-        Nd,
-        cell_start,
-        face_start,
-    )
-
-    # Adjust the indices of the second grid, we will stack the matrices.
-    rc2 += rc1.size
-    rf2 += rf1.size
-    num_rows_cell = (g1.num_cells + g2.num_cells) * proj_dim
-    num_rows_face = (g1.num_faces + g2.num_faces) * proj_dim
+    cc1, dc1, cf1, df1 = mat_inds[idx_map[id(g1)]]
+    cc2, dc2, cf2, df2 = mat_inds[idx_map[id(g2)]]
 
-    known_cell_proj = sps.coo_matrix(
-        (np.hstack((dc1, dc2)), (np.hstack((rc1, rc2)), np.hstack((cc1, cc2)))),
-        shape=(num_rows_cell, NC),
-    ).tocsr()
-    known_face_proj = sps.coo_matrix(
-        (np.hstack((df1, df2)), (np.hstack((rf1, rf2)), np.hstack((cf1, cf2)))),
-        shape=(num_rows_face, NF),
-    ).tocsr()
+    # Stack the two grids. The rows of the second grid simply follow those of
+    # the first one, so the combined matrix still has one entry per row.
+    known_cell_proj = _csr_from_cols(np.hstack((cc1, cc2)), np.hstack((dc1, dc2)), NC)
+    known_face_proj = _csr_from_cols(np.hstack((cf1, cf2)), np.hstack((df1, df2)), NF)
 
     assert _compare_matrices(proj.cell_restriction([g1, g2]), known_cell_proj)
     assert _compare_matrices(proj.cell_prolongation([g1, g2]), known_cell_proj.T)
@@ -142,19 +183,18 @@ def test_subdomain_projections(scalar):
 
 
 @pytest.mark.parametrize("scalar", [True, False])
-def test_mortar_projections(scalar):
+def test_mortar_projections(scalar, cart_bucket):
     # Test of mortar projections between mortar grids and standard subdomain grids.
-    fracs = [np.array([[0, 2], [1, 1]]), np.array([[1, 1], [0, 2]])]
-    gb = pp.meshing.cart_grid(fracs, [2, 2])
-    Nd = gb.dim_max()
+    gb = cart_bucket.gb
+    Nd = cart_bucket.Nd
 
     if scalar:
         proj_dim = 1
     else:
         proj_dim = Nd
 
-    NC = gb.num_cells() * proj_dim
-    NF = gb.num_faces() * proj_dim
+    NC = cart_bucket.NC * proj_dim
+    NF = cart_bucket.NF * proj_dim
     NMC = gb.num_mortar_cells() * proj_dim
 
     g0 = gb.grids_of_dimension(2)[0]
@@ -169,43 +209,43 @@ def test_mortar_projections(scalar):
 
     ########
     # First test projection between all grids and all interfaces
-    grid_list = np.array([g0, g1, g2, g3])
-    edge_list = [(g0, g1), (g0, g2), (g1, g3), (g2, g3)]
+    grid_list = cart_bucket.mortar_grid_list
+    edge_list = cart_bucket.mortar_edge_list
 
-    proj = pp.ad.MortarProjections(grids=grid_list, edges=edge_list, gb=gb, nd=proj_dim)
+    proj = cart_bucket.mortar_projs[proj_dim]
 
-    cell_start = proj_dim * np.cumsum(
-        np.hstack((0, np.array([g.num_cells for g in grid_list])))
-    )
-    face_start = proj_dim * np.cumsum(
-        np.hstack((0, np.array([g.num_faces for g in grid_list])))
-    )
+    cell_start = proj_dim * _starts([g.num_cells for g in grid_list])
+    face_start = proj_dim * _starts([g.num_faces for g in grid_list])
 
     f0 = np.hstack(
         (
-            sps.find(mg01.mortar_to_primary_int(nd=proj_dim))[0],
-            sps.find(mg02.mortar_to_primary_int(nd=proj_dim))[0],
+            _nz_rows(mg01.mortar_to_primary_int(nd=proj_dim)),
+            _nz_rows(mg02.mortar_to_primary_int(nd=proj_dim)),
         )
     )
-    f1 = sps.find(mg13.mortar_to_primary_int(nd=proj_dim))[0]
-    f2 = sps.find(mg23.mortar_to_primary_int(nd=proj_dim))[0]
+    f1 = _nz_rows(mg13.mortar_to_primary_int(nd=proj_dim))
+    f2 = _nz_rows(mg23.mortar_to_primary_int(nd=proj_dim))
 
-    c1 = sps.find(mg01.mortar_to_secondary_int(nd=proj_dim))[0]
-    c2 = sps.find(mg02.mortar_to_secondary_int(nd=proj_dim))[0]
+    c1 = _nz_rows(mg01.mortar_to_secondary_int(nd=proj_dim))
+    c2 = _nz_rows(mg02.mortar_to_secondary_int(nd=proj_dim))
     c3 = np.hstack(
         (
-            sps.find(mg13.mortar_to_secondary_int(nd=proj_dim))[0],
-            sps.find(mg23.mortar_to_secondary_int(nd=proj_dim))[0],
+            _nz_rows(mg13.mortar_to_secondary_int(nd=proj_dim)),
+            _nz_rows(mg23.mortar_to_secondary_int(nd=proj_dim)),
         )
     )
 
+    # The known projections have one entry per mortar cell (column), so the
+    # CSC representation can be assembled directly, skipping the sort and
+    # duplicate summation of a COO conversion.
     rows_higher = np.hstack((f0, f1 + face_start[1], f2 + face_start[2]))
-    cols_higher = np.arange(NMC)
-    data = np.ones(NMC)
 
-    proj_known_higher = sps.coo_matrix(
-        (data, (rows_higher, cols_higher)), shape=(NF, NMC)
+    proj_known_higher = sps.csc_matrix(
+        (np.ones(NMC), rows_higher, np.arange(NMC + 1, dtype=np.int32)),
+        shape=(NF, NMC),
     ).tocsr()
+    proj_known_higher.has_sorted_indices = True
+    proj_known_higher.has_canonical_format = True
 
     assert _compare_matrices(proj_known_higher, proj.mortar_to_primary_int)
     assert _compare_matrices(proj_known_higher, proj.mortar_to_primary_avg)
@@ -213,12 +253,13 @@ def test_mortar_projections(scalar):
     assert _compare_matrices(proj_known_higher.T, proj.primary_to_mortar_avg)
 
     rows_lower = np.hstack((c1 + cell_start[1], c2 + cell_start[2], c3 + cell_start[3]))
-    cols_lower = np.arange(NMC)
-    data = np.ones(NMC)
 
-    proj_known_lower = sps.coo_matrix(
-        (data, (rows_lower, cols_lower)), shape=(NC, NMC)
+    proj_known_lower = sps.csc_matrix(
+        (np.ones(NMC), rows_lower, np.arange(NMC + 1, dtype=np.int32)),
+        shape=(NC, NMC),
     ).tocsr()
+    proj_known_lower.has_sorted_indices = True
+    proj_known_lower.has_canonical_format = True
     assert _compare_matrices(proj_known_lower, proj.mortar_to_secondary_int)
 
     # Also test block matrices for the sign of mortar projections.
@@ -237,41 +278,35 @@ def test_mortar_projections(scalar):
 
 
 @pytest.mark.parametrize("scalar", [True, False])
-def test_boundary_condition(scalar):
+def test_boundary_condition(scalar, cart_bucket):
     """Test of boundary condition representation."""
-    fracs = [np.array([[0, 2], [1, 1]]), np.array([[1, 1], [0, 2]])]
-    gb = pp.meshing.cart_grid(fracs, [2, 2])
-
-    grid_list = np.array([g for g, _ in gb])
+    gb = cart_bucket.gb
+    grid_list = cart_bucket.grid_list
+    Nd = cart_bucket.Nd
 
-    Nd = gb.dim_max()
     key = "foo"
 
     # Start of all faces
-    face_start = np.cumsum(np.hstack((0, np.array([g.num_faces for g in grid_list]))))
+    face_start = _starts([g.num_faces for g in grid_list])
 
-    # Build values of known values (to be filled during assignment of bcs)
+    # Draw all known boundary values in a single call, with a seeded generator
+    # for reproducibility. The per-grid values are slices of this vector.
+    rng = np.random.default_rng(42)
     if scalar:
-        known_values = np.zeros(gb.num_faces())
+        known_values = rng.random(cart_bucket.NF)
     else:
-        known_values = np.zeros(gb.num_faces() * Nd)
+        known_values = rng.random(cart_bucket.NF * Nd)
         # If vector problem, all faces have Nd numbers
         face_start *= Nd
 
-    # Loop over grids, assign values, keep track of assigned values
-    for g, d in gb:
-        grid_ind = _list_ind_of_grid(grid_list, g)
-        if scalar:
-            values = np.random.rand(g.num_faces)
-        else:
-            values = np.random.rand(g.num_faces * Nd)
+    idx_map = _grid_index_map(grid_list)
 
+    # Loop over grids, assign the values belonging to each grid
+    for g, d in gb:
+        grid_ind = idx_map[id(g)]
+        values = known_values[face_start[grid_ind] : face_start[grid_ind + 1]].copy()
         d[pp.PARAMETERS] = {key: {"bc_values": values}}
 
-        # Put face values in the right place in the vector of knowns
-        face_inds = np.arange(face_start[grid_ind], face_start[grid_ind + 1])
-        known_values[face_inds] = values
-
     # Ad representation of the boundary conditions. Parse.
     bc = pp.ad.BoundaryCondition(key, grid_list)
     val = bc.parse(gb)
@@ -521,13 +556,11 @@ def test_variable_combinations(grids, variables):
                 assert expr.jac.shape[1] == dof_manager.num_dofs()
 
 
-def test_ad_discretization_class():
+def test_ad_discretization_class(cart_bucket):
     # Test of the mother class of all discretizations (pp.ad.Discretization)
 
-    fracs = [np.array([[0, 2], [1, 1]]), np.array([[1, 1], [0, 2]])]
-    gb = pp.meshing.cart_grid(fracs, [2, 2])
-
-    grid_list = [g for g, _ in gb]
+    gb = cart_bucket.gb
+    grid_list = list(cart_bucket.grid_list)
     sub_list = grid_list[:2]
 
     # Make two Mock discretizaitons, with different keywords
@@ -571,6 +604,26 @@ def test_ad_discretization_class():
 ## Below are helpers for tests of the Ad wrappers.
 
 
+def _csr_from_cols(cols, data, num_cols):
+    # The known projection matrices have exactly one entry per row, with sorted
+    # and unique column indices. Build the CSR representation directly, thus
+    # bypassing the sorting and summation of duplicates implied by a conversion
+    # from COO format.
+    indptr = np.arange(cols.size + 1, dtype=np.int32)
+    mat = sps.csr_matrix((data, cols, indptr), shape=(cols.size, num_cols))
+    # Tell scipy that the indices are sorted and duplicate free, so that
+    # downstream operations do not spend a canonicalization pass on them.
+    mat.has_sorted_indices = True
+    mat.has_canonical_format = True
+    return mat
+
+
+def _to_csr(m):
+    # Return the matrix itself when it is already CSR, to make explicit that
+    # the hot comparison path does not pay for a format conversion.
+    return m if sps.isspmatrix_csr(m) else m.tocsr()
+
+
 def _compare_matrices(m1, m2):
     if isinstance(m1, pp.ad.Matrix):
         m1 = m1._mat
@@ -578,19 +631,39 @@ def _compare_matrices(m1, m2):
         m2 = m2._mat
     if m1.shape != m2.shape:
         return False
-    d = m1 - m2
-    if d.data.size > 0:
-        if np.max(np.abs(d.data)) > 1e-10:
-            return False
-    return True
+    a, b = _to_csr(m1), _to_csr(m2)
+    if np.array_equal(a.indptr, b.indptr) and np.array_equal(a.indices, b.indices):
+        # The matrices share sparsity structure (the common case in these
+        # tests); comparing the data arrays directly avoids the allocation
+        # and canonicalization of a full sparse subtraction.
+        return np.allclose(a.data, b.data, atol=1e-10)
+    d = a - b
+    return d.data.size == 0 or np.max(np.abs(d.data)) <= 1e-10
+
 
+def _nz_rows(m):
+    # Row indices of the nonzero entries, ordered by column, equivalent to
+    # sps.find(m)[0] for a CSC matrix but without materializing the full COO
+    # triplet. Explicitly stored zeros are masked out, as find does.
+    if not sps.isspmatrix_csc(m):
+        m = m.tocsc()
+    return m.indices[m.data != 0]
 
-def _list_ind_of_grid(grid_list, g):
-    for i, gl in enumerate(grid_list):
-        if g == gl:
-            return i
 
-    raise ValueError("grid is not in list")
+def _starts(nums):
+    # Cumulative offsets with a leading zero. Equivalent to
+    # np.cumsum(np.hstack((0, np.array(nums)))), but fills a preallocated
+    # array instead of creating the three intermediate ones.
+    out = np.empty(len(nums) + 1, dtype=np.int32)
+    out[0] = 0
+    np.cumsum(nums, out=out[1:])
+    return out
+
+
+def _grid_index_map(grid_list):
+    # Map from grid (by id) to its position in the list, to avoid linear scans
+    # inside the per-grid loops.
+    return {id(g): i for i, g in enumerate(grid_list)}
 
 
 class _MockDiscretization:
@@ -601,267 +674,193 @@ class _MockDiscretization:
         self.keyword = key
 
 
-class AdArrays(unittest.TestCase):
-    """Tests for the implementation of the main Ad array class,
-    that is, the functionality needed for the forward Ad operations.
-    """
+## Tests for the implementation of the main Ad array class, that is, the
+## functionality needed for the forward Ad operations.
+
+
+@lru_cache(maxsize=None)
+def _csc(rows):
+    # Cached CSC construction from a tuple of row tuples. The hand-written
+    # Jacobian literals below are reused between tests, so the dense -> COO ->
+    # CSC conversion is paid only once per distinct matrix. The Ad operations
+    # never modify their operands, hence sharing the matrices is safe.
+    return sps.csc_matrix(np.array(rows))
+
+
+# Table of the scalar arithmetic cases: (name, op, a, b, expected val,
+# expected jac). a is given as a (val, jac) pair to be wrapped in an Ad_array;
+# b is either such a pair or a plain scalar.
+_SCALAR_OP_CASES = [
+    ("add_two_scalars", operator.add, (1, 0), (-10, 0), -9, 0),
+    ("add_two_ad_variables", operator.add, (4, 1.0), (9, 3), 13, 4.0),
+    ("add_var_with_scal", operator.add, (3, 2), 3, 6, 2),
+    ("add_scal_with_var", lambda a, b: b + a, (3, 2), 3, 6, 2),
+    ("sub_two_scalars", operator.sub, (1, 0), (3, 0), -2, 0),
+    ("sub_two_ad_variables", operator.sub, (4, 1.0), (9, 3), -5, -2),
+    ("sub_var_with_scal", operator.sub, (3, 2), 3, 0, 2),
+    ("sub_scal_with_var", lambda a, b: b - a, (3, 2), 3, 0, -2),
+    ("mul_scal_ad_scal", operator.mul, (3, 0), (2, 0), 6, 0),
+    ("mul_ad_var_ad_scal", operator.mul, (3, 3), (2, 0), 6, 6),
+    ("mul_ad_var_ad_var", operator.mul, (3, 3), (2, -4), 6, -6),
+    ("mul_ad_var_scal", operator.mul, (3, 3), 3, 9, 9),
+    ("mul_scal_ad_var", lambda a, b: b * a, (3, 3), 3, 9, 9),
+    ("power_advar_scalar", operator.pow, (2, 3), 2, 4, 12),
+    (
+        "power_advar_advar",
+        operator.pow,
+        (4, 4),
+        (-8, -12),
+        4 ** -8,
+        -(2 + 3 * np.log(4)) / 16384,
+    ),
+    ("rpower_advar_scalar", lambda a, b: b ** a, (2, 3), 2, 4, 12 * np.log(2)),
+    ("div_advar_scalar", operator.truediv, (10, 6), 2, 5, 3),
+    ("div_advar_advar", operator.truediv, (8, 12), (4, 4), 2, 1),
+]
 
-    def test_add_two_scalars(self):
-        a = Ad_array(1, 0)
-        b = Ad_array(-10, 0)
-        c = a + b
-        self.assertTrue(c.val == -9 and c.jac == 0)
-        self.assertTrue(a.val == 1 and a.jac == 0)
-        self.assertTrue(b.val == -10 and b.jac == 0)
-
-    def test_add_two_ad_variables(self):
-        a = Ad_array(4, 1.0)
-        b = Ad_array(9, 3)
-        c = a + b
-        self.assertTrue(np.allclose(c.val, 13) and np.allclose(c.jac, 4.0))
-        self.assertTrue(a.val == 4 and np.allclose(a.jac, 1.0))
-        self.assertTrue(b.val == 9 and b.jac == 3)
-
-    def test_add_var_with_scal(self):
-        a = Ad_array(3, 2)
-        b = 3
-        c = a + b
-        self.assertTrue(np.allclose(c.val, 6) and np.allclose(c.jac, 2))
-        self.assertTrue(a.val == 3 and np.allclose(a.jac, 2))
-        self.assertTrue(b == 3)
-
-    def test_add_scal_with_var(self):
-        a = Ad_array(3, 2)
-        b = 3
-        c = b + a
-        self.assertTrue(np.allclose(c.val, 6) and np.allclose(c.jac, 2))
-        self.assertTrue(a.val == 3 and a.jac == 2)
-        self.assertTrue(b == 3)
-
-    def test_sub_two_scalars(self):
-        a = Ad_array(1, 0)
-        b = Ad_array(3, 0)
-        c = a - b
-        self.assertTrue(c.val == -2 and c.jac == 0)
-        self.assertTrue(a.val == 1 and a.jac == 0)
-        self.assertTrue(b.val == 3 and a.jac == 0)
-
-    def test_sub_two_ad_variables(self):
-        a = Ad_array(4, 1.0)
-        b = Ad_array(9, 3)
-        c = a - b
-        self.assertTrue(np.allclose(c.val, -5) and np.allclose(c.jac, -2))
-        self.assertTrue(a.val == 4 and np.allclose(a.jac, 1.0))
-        self.assertTrue(b.val == 9 and b.jac == 3)
-
-    def test_sub_var_with_scal(self):
-        a = Ad_array(3, 2)
-        b = 3
-        c = a - b
-        self.assertTrue(np.allclose(c.val, 0) and np.allclose(c.jac, 2))
-        self.assertTrue(a.val == 3 and a.jac == 2)
-        self.assertTrue(b == 3)
-
-    def test_sub_scal_with_var(self):
-        a = Ad_array(3, 2)
-        b = 3
-        c = b - a
-        self.assertTrue(np.allclose(c.val, 0) and np.allclose(c.jac, -2))
-        self.assertTrue(a.val == 3 and a.jac == 2)
-        self.assertTrue(b == 3)
-
-    def test_mul_scal_ad_scal(self):
-        a = Ad_array(3, 0)
-        b = Ad_array(2, 0)
-        c = a * b
-        self.assertTrue(c.val == 6 and c.jac == 0)
-        self.assertTrue(a.val == 3 and a.jac == 0)
-        self.assertTrue(b.val == 2 and b.jac == 0)
-
-    def test_mul_ad_var_ad_scal(self):
-        a = Ad_array(3, 3)
-        b = Ad_array(2, 0)
-        c = a * b
-        self.assertTrue(c.val == 6 and c.jac == 6)
-        self.assertTrue(a.val == 3 and a.jac == 3)
-        self.assertTrue(b.val == 2 and b.jac == 0)
-
-    def test_mul_ad_var_ad_var(self):
-        a = Ad_array(3, 3)
-        b = Ad_array(2, -4)
-        c = a * b
-        self.assertTrue(c.val == 6 and c.jac == -6)
-        self.assertTrue(a.val == 3 and a.jac == 3)
-        self.assertTrue(b.val == 2 and b.jac == -4)
-
-    def test_mul_ad_var_scal(self):
-        a = Ad_array(3, 3)
-        b = 3
-        c = a * b
-        self.assertTrue(c.val == 9 and c.jac == 9)
-        self.assertTrue(a.val == 3 and a.jac == 3)
-        self.assertTrue(b == 3)
-
-    def test_mul_scar_ad_var(self):
-        a = Ad_array(3, 3)
-        b = 3
-        c = b * a
-        self.assertTrue(c.val == 9 and c.jac == 9)
-        self.assertTrue(a.val == 3 and a.jac == 3)
-        self.assertTrue(b == 3)
-
-    def test_mul_ad_var_mat(self):
-        x = Ad_array(np.array([1, 2, 3]), sps.diags([3, 2, 1]))
-        A = sps.csc_matrix(np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]]))
-        f = x * A
-        sol = np.array([30, 36, 42])
-        jac = np.diag([3, 2, 1]) * A
-
-        self.assertTrue(np.all(f.val == sol) and np.all(f.jac == jac))
-        self.assertTrue(
-            np.all(x.val == np.array([1, 2, 3])) and np.all(x.jac == np.diag([3, 2, 1]))
-        )
-        self.assertTrue(np.all(A == np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]])))
-
-    def test_advar_mul_vec(self):
-        x = Ad_array(np.array([1, 2, 3]), sps.diags([3, 2, 1]))
-        A = np.array([1, 3, 10])
-        f = x * A
-        sol = np.array([1, 6, 30])
-        jac = np.diag([3, 6, 10])
-
-        self.assertTrue(np.all(f.val == sol) and np.all(f.jac == jac))
-        self.assertTrue(
-            np.all(x.val == np.array([1, 2, 3])) and np.all(x.jac == np.diag([3, 2, 1]))
-        )
 
-    def test_advar_m_mul_vec_n(self):
-        x = Ad_array(np.array([1, 2, 3]), sps.diags([3, 2, 1]))
-        vec = np.array([1, 2])
-        R = sps.csc_matrix(np.array([[1, 0, 1], [0, 1, 0]]))
-        y = R * x
-        z = y * vec
-        Jy = np.array([[1, 0, 3], [0, 2, 0]])
-        Jz = np.array([[1, 0, 3], [0, 4, 0]])
-        self.assertTrue(np.all(y.val == [4, 2]))
-        self.assertTrue(np.sum(y.full_jac().A - Jy) == 0)
-        self.assertTrue(np.all(z.val == [4, 4]))
-        self.assertTrue(np.sum(z.full_jac().A - Jz) == 0)
-
-    def test_mul_sps_advar(self):
-        J = sps.csc_matrix(np.array([[1, 3, 1], [5, 0, 0], [5, 1, 2]]))
-        x = Ad_array(np.array([1, 2, 3]), J)
-        A = sps.csc_matrix(np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]]))
-        f = A * x
-
-        self.assertTrue(np.all(f.val == [14, 32, 50]))
-        self.assertTrue(np.all(f.jac == A * J.A))
-
-    def test_mul_advar_vectors(self):
-        Ja = sps.csc_matrix(np.array([[1, 3, 1], [5, 0, 0], [5, 1, 2]]))
-        Jb = sps.csc_matrix(np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]]))
-        a = Ad_array(np.array([1, 2, 3]), Ja)
-        b = Ad_array(np.array([1, 1, 1]), Jb)
-        A = sps.csc_matrix(np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]]))
-
-        f = A * a + b
-        jac = A * Ja + Jb
-
-        self.assertTrue(np.all(f.val == [15, 33, 51]))
-        self.assertTrue(np.sum(f.full_jac() != A * Ja + Jb) == 0)
-        self.assertTrue(
-            np.sum(Ja != sps.csc_matrix(np.array([[1, 3, 1], [5, 0, 0], [5, 1, 2]])))
-            == 0
-        )
-        self.assertTrue(
-            np.sum(Jb != sps.csc_matrix(np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]])))
-            == 0
-        )
+@pytest.mark.parametrize(
+    "op, a_def, b_def, expected_val, expected_jac",
+    [pytest.param(*case[1:], id=case[0]) for case in _SCALAR_OP_CASES],
+)
+def test_scalar_ad_ops(op, a_def, b_def, expected_val, expected_jac):
+    a = Ad_array(*a_def)
+    b = Ad_array(*b_def) if isinstance(b_def, tuple) else b_def
+
+    c = op(a, b)
+
+    np.testing.assert_allclose(c.val, expected_val)
+    np.testing.assert_allclose(c.jac, expected_jac)
+    # The operation should leave its operands untouched.
+    assert a.val == a_def[0] and a.jac == a_def[1]
+    if isinstance(b_def, tuple):
+        assert b.val == b_def[0] and b.jac == b_def[1]
+    else:
+        assert b == b_def
+
+
+def test_mul_ad_var_mat():
+    x = Ad_array(np.array([1, 2, 3]), sps.diags([3, 2, 1]))
+    A = _csc(((1, 2, 3), (4, 5, 6), (7, 8, 9)))
+    f = x * A
+    sol = np.array([30, 36, 42])
+    jac = sps.diags([3, 2, 1]) * A
+
+    assert np.all(f.val == sol)
+    assert _compare_matrices(f.jac, jac)
+    assert np.all(x.val == np.array([1, 2, 3]))
+    assert _compare_matrices(x.jac, sps.diags([3, 2, 1]))
+    assert np.all(A == np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]]))
+
+
+def test_advar_mul_vec():
+    x = Ad_array(np.array([1, 2, 3]), sps.diags([3, 2, 1]))
+    A = np.array([1, 3, 10])
+    f = x * A
+    sol = np.array([1, 6, 30])
+    jac = sps.diags([3, 6, 10])
+
+    assert np.all(f.val == sol)
+    assert _compare_matrices(f.jac, jac)
+    assert np.all(x.val == np.array([1, 2, 3]))
+    assert _compare_matrices(x.jac, sps.diags([3, 2, 1]))
+
+
+def test_advar_m_mul_vec_n():
+    x = Ad_array(np.array([1, 2, 3]), sps.diags([3, 2, 1]))
+    vec = np.array([1, 2])
+    R = _csc(((1, 0, 1), (0, 1, 0)))
+    y = R * x
+    z = y * vec
+    Jy = np.array([[1, 0, 3], [0, 2, 0]])
+    Jz = np.array([[1, 0, 3], [0, 4, 0]])
+    assert np.all(y.val == [4, 2])
+    assert np.sum(y.full_jac().A - Jy) == 0
+    assert np.all(z.val == [4, 4])
+    assert np.sum(z.full_jac().A - Jz) == 0
+
+
+def test_mul_sps_advar():
+    J = _csc(((1, 3, 1), (5, 0, 0), (5, 1, 2)))
+    x = Ad_array(np.array([1, 2, 3]), J)
+    A = _csc(((1, 2, 3), (4, 5, 6), (7, 8, 9)))
+    f = A * x
+
+    assert np.all(f.val == [14, 32, 50])
+    assert _compare_matrices(f.jac, A * J)
+
+
+def test_mul_advar_vectors():
+    Ja = _csc(((1, 3, 1), (5, 0, 0), (5, 1, 2)))
+    Jb = _csc(((1, 0, 0), (0, 1, 0), (0, 0, 1)))
+    a = Ad_array(np.array([1, 2, 3]), Ja)
+    b = Ad_array(np.array([1, 1, 1]), Jb)
+    A = _csc(((1, 2, 3), (4, 5, 6), (7, 8, 9)))
+
+    f = A * a + b
+    jac = A * Ja + Jb
+
+    assert np.all(f.val == [15, 33, 51])
+    assert _compare_matrices(f.full_jac(), jac)
+    assert _compare_matrices(
+        Ja, sps.csc_matrix(np.array([[1, 3, 1], [5, 0, 0], [5, 1, 2]]))
+    )
+    assert _compare_matrices(
+        Jb, sps.csc_matrix(np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]]))
+    )
+
 
-    def test_power_advar_scalar(self):
-        a = Ad_array(2, 3)
-        b = a ** 2
-        self.assertTrue(b.val == 4 and b.jac == 12)
-
-    def test_power_advar_advar(self):
-        a = Ad_array(4, 4)
-        b = Ad_array(-8, -12)
-        c = a ** b
-        jac = -(2 + 3 * np.log(4)) / 16384
-        self.assertTrue(np.allclose(c.val, 4 ** -8) and np.allclose(c.jac, jac))
-
-    def test_rpower_advar_scalar(self):
-        a = Ad_array(2, 3)
-        b = 2 ** a
-        self.assertTrue(b.val == 4 and b.jac == 12 * np.log(2))
-
-    def test_rpower_advar_vector_scalar(self):
-        J = sps.csc_matrix(np.array([[1, 2], [2, 3], [0, 1]]))
-        a = Ad_array(np.array([1, 2, 3]), J)
-        b = 3 ** a
-        bJac = np.array(
+def test_rpower_advar_vector_scalar():
+    J = _csc(((1, 2), (2, 3), (0, 1)))
+    a = Ad_array(np.array([1, 2, 3]), J)
+    b = 3 ** a
+    bJac = sps.csc_matrix(
+        np.array(
             [
                 [3 * np.log(3) * 1, 3 * np.log(3) * 2],
                 [9 * np.log(3) * 2, 9 * np.log(3) * 3],
                 [27 * np.log(3) * 0, 27 * np.log(3) * 1],
             ]
         )
+    )
+
+    assert np.all(b.val == [3, 9, 27])
+    assert _compare_matrices(b.jac, bJac)
+
+
+def test_full_jac():
+    J = np.array(
+        [
+            [1, 3, 5, 1, 2],
+            [1, 5, 1, 2, 5],
+            [6, 2, 4, 6, 0],
+            [2, 4, 1, 9, 9],
+            [6, 2, 1, 45, 2],
+        ]
+    )
+
+    a = Ad_array(np.array([1, 2, 3, 4, 5]), J.copy())
+
+    assert np.sum(a.full_jac() != J) == 0
+
+
+def test_copy_scalar():
+    a = Ad_array(1, 0)
+    b = a.copy()
+    assert a.val == b.val
+    assert a.jac == b.jac
+    a.val = 2
+    a.jac = 3
+    assert b.val == 1
+    assert b.jac == 0
 
-        self.assertTrue(np.all(b.val == [3, 9, 27]))
-        self.assertTrue(np.all(b.jac.A == bJac))
-
-    def test_div_advar_scalar(self):
-        a = Ad_array(10, 6)
-        b = 2
-        c = a / b
-        self.assertTrue(c.val == 5, c.jac == 2)
-
-    def test_div_advar_advar(self):
-        # a = x ^ 3: b = x^2: x = 2
-        a = Ad_array(8, 12)
-        b = Ad_array(4, 4)
-        c = a / b
-        self.assertTrue(c.val == 2 and np.allclose(c.jac, 1))
-
-    def test_full_jac(self):
-        J1 = sps.csc_matrix(
-            np.array([[1, 3, 5], [1, 5, 1], [6, 2, 4], [2, 4, 1], [6, 2, 1]])
-        )
-        J2 = sps.csc_matrix(np.array([[1, 2], [2, 5], [6, 0], [9, 9], [45, 2]]))
-        J = np.array(
-            [
-                [1, 3, 5, 1, 2],
-                [1, 5, 1, 2, 5],
-                [6, 2, 4, 6, 0],
-                [2, 4, 1, 9, 9],
-                [6, 2, 1, 45, 2],
-            ]
-        )
 
-        a = Ad_array(np.array([1, 2, 3, 4, 5]), J.copy())  # np.array([J1, J2]))
-
-        self.assertTrue(np.sum(a.full_jac() != J) == 0)
-
-    def test_copy_scalar(self):
-        a = Ad_array(1, 0)
-        b = a.copy()
-        self.assertTrue(a.val == b.val)
-        self.assertTrue(a.jac == b.jac)
-        a.val = 2
-        a.jac = 3
-        self.assertTrue(b.val == 1)
-        self.assertTrue(b.jac == 0)
-
-    def test_copy_vector(self):
-        a = Ad_array(np.ones((3, 1)), np.ones((3, 1)))
-        b = a.copy()
-        self.assertTrue(np.allclose(a.val, b.val))
-        self.assertTrue(np.allclose(a.jac, b.jac))
-        a.val[0] = 3
-        a.jac[2] = 4
-        self.assertTrue(np.allclose(b.val, np.ones((3, 1))))
-        self.assertTrue(np.allclose(b.jac, np.ones((3, 1))))
-
-
-if __name__ == "__main__":
-    unittest.main()
+def test_copy_vector():
+    a = Ad_array(np.ones((3, 1)), np.ones((3, 1)))
+    b = a.copy()
+    np.testing.assert_allclose(a.val, b.val)
+    np.testing.assert_allclose(a.jac, b.jac)
+    a.val[0] = 3
+    a.jac[2] = 4
+    np.testing.assert_allclose(b.val, np.ones((3, 1)))
+    np.testing.assert_allclose(b.jac, np.ones((3, 1)))